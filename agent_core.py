@@ -1,65 +1,222 @@
 # Langgraphのチェックポイント、Human-in-the-Loop、ストリーミングを活用したエージェント
 # AIエージェントはユーザーからのフィードバックを反映して、次の行動を決定します。
 
+import asyncio
+import sqlite3
+import sys
+import uuid
 from dataclasses import dataclass
 from typing import Protocol
+import aiosqlite
+import boto3
 from botocore.config import Config
+from pydantic import BaseModel, Field
 from langchain.chat_models import init_chat_model
 from langchain_community.agent_toolkits import FileManagementToolkit
+from langchain_core.tools import BaseTool, StructuredTool
 from langchain_tavily import TavilySearch
 from langchain_core.messages import (
     BaseMessage,
     SystemMessage,
+    HumanMessage,
     AIMessage,
     ToolMessage,
     ToolCall
 )
 from langgraph.types import interrupt
-from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
 from langgraph.func import entrypoint, task
-from langgraph.graph import add_messages
 
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# 全LLMインスタンスで共有するBedrockクライアント
+# 並列ツール実行・LLM呼び出しがコネクションプールを奪い合わないよう
+# プールサイズを拡大し、TLS再ハンドシェイクをkeepaliveで回避する
+_BEDROCK_CONFIG = Config(
+    read_timeout=300,
+    max_pool_connections=32,
+    tcp_keepalive=True,
+    retries={"mode": "adaptive", "max_attempts": 5},
+)
+_boto_session = boto3.Session()
+_bedrock_client = _boto_session.client("bedrock-runtime", config=_BEDROCK_CONFIG)
+
 
 # LLM呼び出しタスク用の関数
 @task
-def _invoke_llm_task(llm, messages: list[BaseMessage], system_prompt: str) -> AIMessage:
+async def _invoke_llm_task(llm, messages: list[BaseMessage]) -> AIMessage:
     """LLMを呼び出すタスク関数
 
     Args:
         llm: 呼び出すLLMインスタンス
-        messages: 会話履歴メッセージ
-        system_prompt: システムプロンプト
+        messages: システムプロンプトを含む会話履歴メッセージ
 
     Returns:
         AIMessage: LLMの応答
     """
-    response = llm.invoke(
-        [SystemMessage(content=system_prompt)] + messages
-    )
+    response = await llm.ainvoke(messages)
     return response
 
 
+# 履歴要約タスク用の関数
+@task
+async def _summarize_messages_task(llm, messages: list[BaseMessage], instruction: str) -> str:
+    """会話履歴を要約するタスク関数
+
+    Args:
+        llm: 要約に使用するLLMインスタンス
+        messages: 要約対象のメッセージ
+        instruction: 要約指示プロンプト
+
+    Returns:
+        str: 要約テキスト
+    """
+    response = await llm.ainvoke([SystemMessage(content=instruction), *messages])
+    return response.text()
+
+
 # ツール実行タスク用の関数
 @task
-def _execute_tool_task(tool, tool_call: ToolCall) -> ToolMessage:
+async def _execute_tool_task(invoker, tool_call: ToolCall, observation_store) -> ToolMessage:
     """ツールを実行するタスク関数
 
+    観測結果はObservationStoreに退避し、ToolMessage自体は
+    空のcontentで返す(LLM送信直前に実体化される)。
+
     Args:
-        tool: 実行するツール
+        invoker: ツールの非同期呼び出しメソッド
         tool_call: ツール呼び出し情報
+        observation_store: 観測結果の退避先ストア
 
     Returns:
-        ToolMessage: ツール実行結果
+        ToolMessage: 観測結果をストアに退避した実行結果
+    """
+    observation = await invoker(tool_call["args"])
+    observation_store.put(tool_call["id"], [str(observation)])
+    return ToolMessage(content="", tool_call_id=tool_call["id"])
+
+
+# ファイル書き込み開始タスク用の関数
+@task
+async def _start_file_write_task(invoker, tool_call: ToolCall, pending_writes) -> ToolMessage:
+    """ファイル書き込みをバックグラウンドで開始するタスク関数
+
+    書き込み完了を待たずに空のToolMessageを返し、後続処理と
+    ディスクI/Oをオーバーラップさせる。実際の書き込み結果は
+    wait_for_pending_writesが観測ストアへ反映する。
+    タスク化により、interrupt再開時のリプレイでは結果が再利用され、
+    同じ書き込みが再スケジュールされることはない。
+
+    Args:
+        invoker: ファイル書き込みツールの非同期呼び出しメソッド
+        tool_call: ファイル書き込みツールの呼び出し情報
+        pending_writes: 実行中書き込みの登録先リスト
+
+    Returns:
+        ToolMessage: 観測結果を後から実体化する実行結果
+    """
+    pending_writes.append(
+        (tool_call["id"], asyncio.create_task(invoker(tool_call["args"])))
+    )
+    return ToolMessage(content="", tool_call_id=tool_call["id"])
+
+
+class BatchInvocation(BaseModel):
+    """batchツール内の個々のツール呼び出し
+
+    Attributes:
+        tool_name: 呼び出すツール名
+        arguments: ツールに渡す引数
+    """
+    tool_name: str = Field(description="呼び出すツール名")
+    arguments: dict = Field(description="ツールに渡す引数")
+
+
+class BatchInput(BaseModel):
+    """batchツールの入力スキーマ
+
+    Attributes:
+        invocations: 並列実行する独立したツール呼び出しのリスト
     """
-    observation = tool.invoke(tool_call["args"])
-    return ToolMessage(content=observation, tool_call_id=tool_call["id"])
+    invocations: list[BatchInvocation] = Field(
+        description="並列実行する独立したツール呼び出しのリスト"
+    )
 
 
-@dataclass(frozen=True)
+class ObservationStore:
+    """ツール実行結果を保持する責務を持つクラス
+
+    目的: 大きな観測結果をToolMessageに直接抱え込まず、
+         LLM送信直前にのみ文字列として実体化する。
+         実体はチェックポイントと同じくSQLiteに置くことで、
+         長時間プロセスでもメモリに蓄積せず、プロセス再起動後の
+         スレッド再開でも観測結果を復元できる
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Args:
+            db_path: 観測結果を保存するSQLiteデータベースのパス
+        """
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS observations ("
+            "tool_call_id TEXT PRIMARY KEY, content TEXT NOT NULL)"
+        )
+        self._connection.commit()
+
+    def put(self, tool_call_id: str, chunks: list[str]) -> None:
+        """観測結果のチャンクを結合して登録
+
+        Args:
+            tool_call_id: ツール呼び出しID
+            chunks: 観測結果のチャンクリスト
+        """
+        self._connection.execute(
+            "INSERT OR REPLACE INTO observations VALUES (?, ?)",
+            (tool_call_id, "".join(chunks)),
+        )
+        self._connection.commit()
+
+    def contains(self, tool_call_id: str) -> bool:
+        """観測結果が登録済みか判定
+
+        Args:
+            tool_call_id: ツール呼び出しID
+
+        Returns:
+            bool: 登録済みの場合True
+        """
+        row = self._connection.execute(
+            "SELECT 1 FROM observations WHERE tool_call_id = ?",
+            (tool_call_id,),
+        ).fetchone()
+        return row is not None
+
+    def render(self, tool_call_id: str) -> str:
+        """観測結果を1つの文字列として実体化
+
+        Args:
+            tool_call_id: ツール呼び出しID
+
+        Returns:
+            str: 結合された観測結果
+
+        Raises:
+            KeyError: 観測結果が未登録の場合
+        """
+        row = self._connection.execute(
+            "SELECT content FROM observations WHERE tool_call_id = ?",
+            (tool_call_id,),
+        ).fetchone()
+        if row is None:
+            raise KeyError(f"ツール観測結果 '{tool_call_id}' が見つかりません")
+        return row[0]
+
+
+@dataclass(frozen=True, slots=True)
 class ToolApprovalRequest:
     """ツール実行承認リクエストを表す値オブジェクト
 
@@ -81,13 +238,11 @@ class ToolApprovalRequest:
         Returns:
             dict: interrupt関数用のデータ辞書
         """
-        data = {
+        return {
             "name": self.tool_name,
-            "args": self.display_args
+            "args": self.display_args,
+            **({"html": self.html_content} if self.html_content else {})
         }
-        if self.html_content:
-            data["html"] = self.html_content
-        return data
 
 
 class ToolApprovalRequestFactory:
@@ -104,6 +259,11 @@ class ToolApprovalRequestFactory:
         """
         self._web_search_tool_name = web_search_tool_name
         self._file_write_tool_name = file_write_tool_name
+        # ツール名→生成ハンドラ の事前ディスパッチ表(O(1)で分岐なし)
+        self._handlers = {
+            web_search_tool_name: self._create_web_search_request,
+            file_write_tool_name: self._create_file_write_request,
+        }
 
     def create_from_tool_call(self, tool_call: ToolCall) -> ToolApprovalRequest:
         """ToolCallから承認リクエストを生成
@@ -114,21 +274,42 @@ class ToolApprovalRequestFactory:
         Returns:
             ToolApprovalRequest: 生成された承認リクエスト
         """
-        tool_name = tool_call["name"]
-        tool_args = tool_call["args"]
+        tool_name = sys.intern(tool_call["name"])
+        handler = self._handlers.get(tool_name, self._create_generic_request)
+        return handler(tool_name, tool_call["args"])
 
-        if tool_name == self._web_search_tool_name:
-            return self._create_web_search_request(tool_name, tool_args)
-        elif tool_name == self._file_write_tool_name:
-            return self._create_file_write_request(tool_name, tool_args)
-        else:
-            return self._create_generic_request(tool_name, tool_args)
+    def create_requests_from_tool_call(self, tool_call: ToolCall) -> list[ToolApprovalRequest]:
+        """ToolCallから承認リクエストのリストを生成
+
+        batchツールの呼び出しは内部呼び出しごとの承認リクエストに
+        展開する。これによりbatchに包まれたファイル書き込みも
+        HTMLプレビュー付きの承認画面を通る。
+
+        Args:
+            tool_call: LLMからのツール呼び出し情報
+
+        Returns:
+            list[ToolApprovalRequest]: 生成された承認リクエストのリスト
+        """
+        if tool_call["name"] != ToolRegistry.BATCH_TOOL_NAME:
+            return [self.create_from_tool_call(tool_call)]
+
+        return [
+            self.create_from_tool_call(
+                ToolCall(
+                    name=invocation["tool_name"],
+                    args=invocation["arguments"],
+                    id=f'{tool_call["id"]}_{index}',
+                )
+            )
+            for index, invocation in enumerate(tool_call["args"]["invocations"])
+        ]
 
     def _create_web_search_request(self, tool_name: str, args: dict) -> ToolApprovalRequest:
         """Web検索用の承認リクエストを生成"""
-        display_args = f' ツール名\n {tool_name}\n 引数\n'
-        for key, value in args.items():
-            display_args += f' {key}: {value}\n'
+        parts = [" ツール名", f" {tool_name}", " 引数"]
+        parts.extend(f" {key}: {value}" for key, value in args.items())
+        display_args = "\n".join(parts) + "\n"
         return ToolApprovalRequest(tool_name=tool_name, display_args=display_args)
 
     def _create_file_write_request(self, tool_name: str, args: dict) -> ToolApprovalRequest:
@@ -159,22 +340,87 @@ class ToolExecutionApprover:
         """
         self._request_factory = request_factory
 
-    def request_approval(self, tool_call: ToolCall) -> ToolCall | ToolMessage:
-        """ツール実行の承認をユーザーに要求
+    def request_approvals(
+        self,
+        tool_calls: list[ToolCall]
+    ) -> list[tuple[ToolCall | None, ToolMessage | None]]:
+        """複数ツール実行の承認を1回の割り込みでユーザーに要求
+
+        batchツールの呼び出しは内部呼び出しごとの承認リクエストに
+        展開され、フィードバックも内部呼び出し単位で受け取る。
+
+        Args:
+            tool_calls: 承認を求めるツール呼び出しリスト
+
+        Returns:
+            list[tuple[ToolCall | None, ToolMessage | None]]:
+                ツール呼び出しごとの (承認されたツール呼び出し, 拒否メッセージ) の組。
+                承認時は前者のみ、拒否時は後者のみが設定される
+        """
+        requests_per_call = [
+            self._request_factory.create_requests_from_tool_call(tool_call)
+            for tool_call in tool_calls
+        ]
+        feedbacks = interrupt([
+            request.to_interrupt_data()
+            for requests in requests_per_call
+            for request in requests
+        ])
+
+        results = []
+        cursor = 0
+        for tool_call, requests in zip(tool_calls, requests_per_call):
+            call_feedbacks = feedbacks[cursor:cursor + len(requests)]
+            cursor += len(requests)
+            results.append(self._resolve_feedback(tool_call, call_feedbacks))
+        return results
+
+    def _resolve_feedback(
+        self,
+        tool_call: ToolCall,
+        call_feedbacks: list[str]
+    ) -> tuple[ToolCall | None, ToolMessage | None]:
+        """フィードバックをツール呼び出し単位の承認/拒否に解決
+
+        batchツールは1件でも承認があれば実行に回し、内部呼び出しごとの
+        フィードバックを実行側へ引き継ぐ(拒否された内部呼び出しも
+        拒否の観測結果としてLLMに伝えるため)。全拒否の場合のみ
+        拒否メッセージを返す。
 
         Args:
-            tool_call: 承認を求めるツール呼び出し
+            tool_call: 対象のツール呼び出し
+            call_feedbacks: この呼び出しに対応するフィードバックのリスト
 
         Returns:
-            ToolCall: 承認された場合は元のツール呼び出し
-            ToolMessage: 拒否された場合は拒否メッセージ
+            tuple[ToolCall | None, ToolMessage | None]:
+                (承認されたツール呼び出し, 拒否メッセージ) の組
         """
-        approval_request = self._request_factory.create_from_tool_call(tool_call)
-        feedback = interrupt(approval_request.to_interrupt_data())
+        if tool_call["name"] == ToolRegistry.BATCH_TOOL_NAME:
+            if any(feedback == "APPROVE" for feedback in call_feedbacks):
+                return (ToolCall(
+                    name=tool_call["name"],
+                    args={
+                        "invocations": tool_call["args"]["invocations"],
+                        "feedbacks": list(call_feedbacks),
+                    },
+                    id=tool_call["id"],
+                ), None)
+            return (None, self._create_rejection_message(tool_call))
+
+        if call_feedbacks[0] == "APPROVE":
+            return (tool_call, None)
+        return (None, self._create_rejection_message(tool_call))
+
+    @staticmethod
+    def _create_rejection_message(tool_call: ToolCall) -> ToolMessage:
+        """拒否されたツール呼び出しへの応答メッセージを生成
 
-        if feedback == "APPROVE":
-            return tool_call
+        Args:
+            tool_call: 拒否されたツール呼び出し
 
+        Returns:
+            ToolMessage: 拒否を伝える実行結果メッセージ
+        """
         return ToolMessage(
             content="ツールの利用が拒否されたので、処理を終了してください。",
             name=tool_call["name"],
@@ -188,6 +434,8 @@ class ToolRegistry:
     目的: ツールの初期化とアクセスをカプセル化
     """
 
+    BATCH_TOOL_NAME = "batch"
+
     def __init__(self, working_directory: str):
         """
         Args:
@@ -195,7 +443,18 @@ class ToolRegistry:
         """
         self._working_directory = working_directory
         self._tools = self._initialize_tools()
-        self._tools_by_name = {tool.name: tool for tool in self._tools}
+        # 正規のツール名をintern済み文字列にしておくと、毎ターンの
+        # 辞書参照・等値比較がポインタ比較の高速パスで済む
+        self._tools_by_name = {
+            sys.intern(tool.name): tool for tool in self._tools
+        }
+        # ホットパス用に 名前→非同期呼び出しメソッド を事前に束縛しておく
+        self._invokers = {
+            sys.intern(tool.name): self._create_invoker(tool)
+            for tool in self._tools
+        }
+        self._web_search_tool_name = sys.intern(self._tools[0].name)
+        self._file_write_tool_name = sys.intern(self._tools[1].name)
 
     def _initialize_tools(self) -> list:
         """ツールの初期化
@@ -211,7 +470,47 @@ class ToolRegistry:
         )
         write_file = file_toolkit.get_tools()[0]
 
-        return [web_search, write_file]
+        batch = StructuredTool.from_function(
+            func=self._reject_direct_batch_call,
+            name=self.BATCH_TOOL_NAME,
+            description="独立した複数のツール呼び出しを1回にまとめて並列実行します。",
+            args_schema=BatchInput,
+        )
+
+        return [web_search, write_file, batch]
+
+    @staticmethod
+    def _create_invoker(tool):
+        """ツールの非同期呼び出しメソッドを生成
+
+        ネイティブの非同期実装を持たないツールは、イベントループを
+        ブロックしないようワーカースレッドへ退避して実行する。
+
+        Args:
+            tool: 対象のツール
+
+        Returns:
+            非同期呼び出しメソッド
+        """
+        if type(tool)._arun is not BaseTool._arun:
+            return tool.ainvoke
+
+        async def _invoke_in_thread(args: dict):
+            return await asyncio.to_thread(tool.invoke, args)
+
+        return _invoke_in_thread
+
+    @staticmethod
+    def _reject_direct_batch_call(invocations: list) -> str:
+        """batchツールの直接実行を防ぐプレースホルダ
+
+        batchツールはToolExecutorが内部呼び出しに展開するため、
+        ツール単体として実行されることは想定していない。
+
+        Raises:
+            NotImplementedError: 常に送出される
+        """
+        raise NotImplementedError("batchツールはToolExecutorが展開して実行します")
 
     def get_all_tools(self) -> list:
         """全ツールを取得
@@ -237,15 +536,31 @@ class ToolRegistry:
             raise KeyError(f"ツール '{name}' が見つかりません")
         return self._tools_by_name[name]
 
+    def get_invoker_by_name(self, name: str):
+        """名前でツールの非同期呼び出しメソッドを取得
+
+        Args:
+            name: ツール名
+
+        Returns:
+            事前に束縛された非同期呼び出しメソッド
+
+        Raises:
+            KeyError: 指定された名前のツールが存在しない場合
+        """
+        if name not in self._invokers:
+            raise KeyError(f"ツール '{name}' が見つかりません")
+        return self._invokers[name]
+
     @property
     def web_search_tool_name(self) -> str:
         """Web検索ツールの名前を取得"""
-        return self._tools[0].name
+        return self._web_search_tool_name
 
     @property
     def file_write_tool_name(self) -> str:
         """ファイル書き込みツールの名前を取得"""
-        return self._tools[1].name
+        return self._file_write_tool_name
 
 
 class AgentLLMInvoker:
@@ -262,14 +577,35 @@ class AgentLLMInvoker:
 - ファイル形式はHTML形式に変換して保存して下さい。
   * Web検索が拒否された場合、Web検索を中止して下さい。
   * レポート保存が拒否された場合、レポート保存を中止し、内容をユーザーに伝えて下さい。
+- 独立した操作は `batch` ツールで1回にまとめて下さい。
+"""
+
+    SUMMARIZER_MODEL = "us.anthropic.claude-3-5-haiku-20241022-v1:0"
+
+    SUMMARY_INSTRUCTION = """
+これまでの会話履歴を要約して下さい。
+- ユーザーのリクエスト内容、実行したツールとその結果の要点、未完了の作業を残して下さい。
+- 要約のみを出力して下さい。
 """
 
-    def __init__(self, tools: list):
+    def __init__(self, tools: list, observation_store: ObservationStore):
         """
         Args:
             tools: LLMにバインドするツールのリスト
+            observation_store: ツール観測結果の退避先ストア
         """
         self._llm = self._initialize_llm(tools)
+        self._summarizer_llm = self._initialize_summarizer_llm()
+        self._observation_store = observation_store
+        # Converse APIのcachePointブロックでシステムプロンプトをキャッシュする
+        # (ChatBedrockConverse.create_cache_pointと同形式。Anthropic形式の
+        # cache_controlキーはlangchain-awsの変換で落とされるため使えない)
+        self._system_message = SystemMessage(
+            content=[
+                {"type": "text", "text": self.SYSTEM_PROMPT},
+                {"cachePoint": {"type": "default"}},
+            ]
+        )
 
     def _initialize_llm(self, tools: list):
         """LLMを初期化
@@ -280,13 +616,27 @@ class AgentLLMInvoker:
         Returns:
             初期化されたLLM
         """
-        cfg = Config(read_timeout=300)
         return init_chat_model(
             model="us.anthropic.claude-3-7-sonnet-20250219-v1:0",
             model_provider="bedrock_converse",
-            config=cfg,
+            client=_bedrock_client,
+            additional_model_request_fields={
+                "anthropic_beta": ["prompt-caching-2024-07-31"]
+            },
         ).bind_tools(tools)
 
+    def _initialize_summarizer_llm(self):
+        """履歴要約用の軽量LLMを初期化
+
+        Returns:
+            初期化された要約用LLM
+        """
+        return init_chat_model(
+            model=self.SUMMARIZER_MODEL,
+            model_provider="bedrock_converse",
+            client=_bedrock_client,
+        )
+
     def invoke(self, messages: list[BaseMessage]):
         """LLMを呼び出す(タスクとして実行)
 
@@ -294,9 +644,39 @@ class AgentLLMInvoker:
             messages: 会話履歴メッセージ
 
         Returns:
-            Future: LLM呼び出しの非同期結果
+            LLM呼び出しの非同期結果(await可能なFuture)
         """
-        return _invoke_llm_task(self._llm, messages, self.SYSTEM_PROMPT)
+        self._hydrate_tool_messages(messages)
+        return _invoke_llm_task(self._llm, [self._system_message, *messages])
+
+    def _hydrate_tool_messages(self, messages: list[BaseMessage]) -> None:
+        """退避された観測結果をToolMessageに実体化
+
+        空のままの観測結果をLLMへ送ると推論が静かに破綻するため、
+        ストアに見つからない場合は例外で即座に失敗させる。
+
+        Args:
+            messages: 会話履歴メッセージ
+
+        Raises:
+            KeyError: 観測結果がストアに存在しない場合
+        """
+        for message in messages:
+            if isinstance(message, ToolMessage) and not message.content:
+                message.content = self._observation_store.render(message.tool_call_id)
+
+    def summarize(self, messages: list[BaseMessage]):
+        """会話履歴を要約する(タスクとして実行)
+
+        Args:
+            messages: 要約対象のメッセージ
+
+        Returns:
+            要約の非同期結果(await可能なFuture)
+        """
+        return _summarize_messages_task(
+            self._summarizer_llm, messages, self.SUMMARY_INSTRUCTION
+        )
 
 
 class ToolExecutor:
@@ -305,12 +685,15 @@ class ToolExecutor:
     目的: ツールの実行ロジックをカプセル化
     """
 
-    def __init__(self, tool_registry: ToolRegistry):
+    def __init__(self, tool_registry: ToolRegistry, observation_store: ObservationStore):
         """
         Args:
             tool_registry: ツールレジストリ
+            observation_store: 観測結果の退避先ストア
         """
         self._tool_registry = tool_registry
+        self._observation_store = observation_store
+        self._pending_writes: list[tuple[str, asyncio.Task]] = []
 
     def execute(self, tool_call: ToolCall):
         """ツールを実行(タスクとして実行)
@@ -319,10 +702,208 @@ class ToolExecutor:
             tool_call: 実行するツール呼び出し
 
         Returns:
-            Future: ツール実行の非同期結果
+            ツール実行の非同期結果(await可能なFuture)
+        """
+        # intern済み文字列同士の==はポインタ一致の高速パスで決着する
+        # (isは定数のintern状況に依存して静かに誤分岐しうるため使わない)
+        tool_name = sys.intern(tool_call["name"])
+
+        if tool_name == ToolRegistry.BATCH_TOOL_NAME:
+            return self._execute_batch(tool_call)
+
+        if tool_name == self._tool_registry.file_write_tool_name:
+            return self._execute_file_write(tool_call)
+
+        invoker = self._tool_registry.get_invoker_by_name(tool_name)
+        return _execute_tool_task(invoker, tool_call, self._observation_store)
+
+    def _execute_file_write(self, tool_call: ToolCall):
+        """ファイル書き込みをバックグラウンドで開始(タスクとして実行)
+
+        書き込み完了を待たずに後続処理とディスクI/Oをオーバーラップ
+        させる。結果の反映は wait_for_pending_writes が行う。
+
+        Args:
+            tool_call: ファイル書き込みツールの呼び出し情報
+
+        Returns:
+            ツール実行の非同期結果(await可能なFuture)
+        """
+        invoker = self._tool_registry.get_invoker_by_name(tool_call["name"])
+        return _start_file_write_task(invoker, tool_call, self._pending_writes)
+
+    async def wait_for_pending_writes(self) -> None:
+        """バックグラウンドのファイル書き込み完了を待ち、結果を反映
+
+        WriteFileToolは失敗時も例外ではなく "Error: ..." 等の文字列を
+        返すため、戻り値をそのまま観測結果として登録する。これにより
+        失敗した書き込みが成功として報告されることはなく、LLMは
+        実際の結果に応じて次の行動を決められる。
+
+        Raises:
+            Exception: 書き込みタスク自体が失敗した場合はその例外を送出
+        """
+        if not self._pending_writes:
+            return
+
+        pending, self._pending_writes = self._pending_writes, []
+        results = await asyncio.gather(
+            *(write_task for _, write_task in pending)
+        )
+        for (tool_call_id, _), result in zip(pending, results):
+            self._observation_store.put(tool_call_id, [str(result)])
+
+    REJECTED_OBSERVATION = "ツールの利用が拒否されたので、この操作を中止してください。"
+
+    async def _execute_batch(self, tool_call: ToolCall) -> ToolMessage:
+        """batchツールを内部呼び出しに展開して並列実行
+
+        承認された内部呼び出しのみを実行し、拒否された内部呼び出しは
+        拒否を表す観測結果を登録する。これにより部分承認でも
+        「何が拒否されたか」がLLMに伝わり、拒否済みツールの再要求と
+        再interruptを防ぐ。
+
+        Args:
+            tool_call: batchツールの呼び出し情報
+
+        Returns:
+            ToolMessage: 内部呼び出し結果をまとめた実行結果
+        """
+        invocations = tool_call["args"]["invocations"]
+        feedbacks = tool_call["args"].get(
+            "feedbacks", ["APPROVE"] * len(invocations)
+        )
+        inner_calls = [
+            ToolCall(
+                name=invocation["tool_name"],
+                args=invocation["arguments"],
+                id=f'{tool_call["id"]}_{index}',
+            )
+            for index, invocation in enumerate(invocations)
+        ]
+
+        for inner_call, feedback in zip(inner_calls, feedbacks):
+            if feedback != "APPROVE":
+                self._observation_store.put(
+                    inner_call["id"], [self.REJECTED_OBSERVATION]
+                )
+
+        await asyncio.gather(
+            *(
+                self._execute_inner_call(inner_call)
+                for inner_call, feedback in zip(inner_calls, feedbacks)
+                if feedback == "APPROVE"
+            )
+        )
+
+        combined_chunks = [
+            f'{inner_call["name"]}: {self._observation_store.render(inner_call["id"])}\n'
+            for inner_call in inner_calls
+        ]
+        self._observation_store.put(tool_call["id"], combined_chunks)
+        return ToolMessage(content="", tool_call_id=tool_call["id"])
+
+    async def _execute_inner_call(self, inner_call: ToolCall) -> None:
+        """batch内部の1つのツール呼び出しを実行
+
+        ツール名はLLMが生成した自由文字列のため、存在しない名前や
+        batchの入れ子はグラフ全体を落とさず、エラーを観測結果として
+        LLMに返す。
+
+        Args:
+            inner_call: 実行する内部ツール呼び出し
+        """
+        if inner_call["name"] == ToolRegistry.BATCH_TOOL_NAME:
+            self._observation_store.put(
+                inner_call["id"],
+                ["エラー: batchツールを入れ子にすることはできません"]
+            )
+            return
+
+        try:
+            invoker = self._tool_registry.get_invoker_by_name(inner_call["name"])
+        except KeyError as error:
+            self._observation_store.put(inner_call["id"], [f"エラー: {error.args[0]}"])
+            return
+
+        await _execute_tool_task(invoker, inner_call, self._observation_store)
+
+
+class MessageWindowCompressor:
+    """会話履歴を要約圧縮する責務を持つクラス
+
+    目的: ターンを重ねて肥大する履歴を要約で置き換え、
+         LLMに送るプロンプトサイズをほぼ一定に保つ
+    """
+
+    def __init__(self, max_tokens: int = 4000, keep_recent: int = 6):
+        """
+        Args:
+            max_tokens: 圧縮を開始する概算トークン数の閾値
+            keep_recent: 要約せずに残す直近メッセージ数
+        """
+        self._max_tokens = max_tokens
+        self._keep_recent = keep_recent
+
+    async def compress(
+        self,
+        messages: list[BaseMessage],
+        llm_invoker: "AgentLLMInvoker"
+    ) -> list[BaseMessage]:
+        """閾値を超えた履歴を要約メッセージに置き換える
+
+        Args:
+            messages: 現在の会話履歴
+            llm_invoker: 要約に使用するLLM呼び出し管理
+
+        Returns:
+            list[BaseMessage]: 圧縮後の会話履歴
         """
-        tool = self._tool_registry.get_tool_by_name(tool_call["name"])
-        return _execute_tool_task(tool, tool_call)
+        if self._estimate_tokens(messages) <= self._max_tokens:
+            return messages
+
+        split_index = self._find_split_index(messages)
+        older, recent = messages[:split_index], messages[split_index:]
+        if not older:
+            return messages
+
+        # Bedrock Converseは会話がユーザーターンから始まることを要求する。
+        # recentがAIMessageから始まっても成立するよう、要約はHumanMessageで注入する
+        summary = await llm_invoker.summarize(older)
+        summary_message = HumanMessage(
+            content=f"これまでの会話の要約:\n{summary}"
+        )
+        return [summary_message, *recent]
+
+    def _find_split_index(self, messages: list[BaseMessage]) -> int:
+        """要約対象と保持対象の境界を決定
+
+        ToolMessageが対応するAIMessageから切り離されないように、
+        境界を手前にずらして調整する。
+
+        Args:
+            messages: 現在の会話履歴
+
+        Returns:
+            int: 保持対象が始まるインデックス
+        """
+        split_index = max(len(messages) - self._keep_recent, 0)
+        while split_index > 0 and isinstance(messages[split_index], ToolMessage):
+            split_index -= 1
+        return split_index
+
+    @staticmethod
+    def _estimate_tokens(messages: list[BaseMessage]) -> int:
+        """メッセージ全体の概算トークン数を算出
+
+        Args:
+            messages: 対象メッセージ
+
+        Returns:
+            int: 文字数ベースの概算トークン数
+        """
+        total_chars = sum(len(str(message.content)) for message in messages)
+        return total_chars // 4
 
 
 class ResearchAgent:
@@ -336,19 +917,22 @@ class ResearchAgent:
         self,
         llm_invoker: AgentLLMInvoker,
         tool_executor: ToolExecutor,
-        approval_manager: ToolExecutionApprover
+        approval_manager: ToolExecutionApprover,
+        message_compressor: MessageWindowCompressor
     ):
         """
         Args:
             llm_invoker: LLM呼び出し管理
             tool_executor: ツール実行管理
             approval_manager: ツール承認管理
+            message_compressor: 会話履歴の要約圧縮管理
         """
         self._llm_invoker = llm_invoker
         self._tool_executor = tool_executor
         self._approval_manager = approval_manager
+        self._message_compressor = message_compressor
 
-    def run(self, messages: list[BaseMessage]) -> AIMessage:
+    async def run(self, messages: list[BaseMessage]) -> AIMessage:
         """エージェントを実行
 
         Args:
@@ -357,21 +941,28 @@ class ResearchAgent:
         Returns:
             AIMessage: 最終的なLLM応答
         """
-        llm_response = self._llm_invoker.invoke(messages).result()
+        llm_response = await self._llm_invoker.invoke(messages)
 
         while llm_response.tool_calls:
             approved_tools, rejection_messages = self._process_tool_approvals(
                 llm_response.tool_calls
             )
 
-            tool_results = self._execute_approved_tools(approved_tools)
+            tool_results = await self._execute_approved_tools(approved_tools)
 
-            messages = add_messages(
-                messages,
-                [llm_response, *tool_results, *rejection_messages]
+            # tool_call_idはターン内で一意なので、add_messagesの
+            # 重複IDスキャンを通さず直接リストへ追記する
+            messages.append(llm_response)
+            messages.extend(tool_results)
+            messages.extend(rejection_messages)
+            messages = await self._message_compressor.compress(
+                messages, self._llm_invoker
             )
 
-            llm_response = self._llm_invoker.invoke(messages).result()
+            # 次のLLM呼び出しで観測結果を実体化する前に、実行中の
+            # 書き込みを完了させて実際の結果をストアへ反映する
+            await self._tool_executor.wait_for_pending_writes()
+            llm_response = await self._llm_invoker.invoke(messages)
 
         return llm_response
 
@@ -387,19 +978,13 @@ class ResearchAgent:
         Returns:
             tuple: (承認されたツールリスト, 拒否メッセージリスト)
         """
-        approved_tools = []
-        rejection_messages = []
-
-        for tool_call in tool_calls:
-            feedback = self._approval_manager.request_approval(tool_call)
-            if isinstance(feedback, ToolMessage):
-                rejection_messages.append(feedback)
-            else:
-                approved_tools.append(feedback)
+        feedbacks = self._approval_manager.request_approvals(tool_calls)
 
+        approved_tools = [approved for approved, _ in feedbacks if approved]
+        rejection_messages = [rejected for _, rejected in feedbacks if rejected]
         return approved_tools, rejection_messages
 
-    def _execute_approved_tools(self, approved_tools: list[ToolCall]) -> list[ToolMessage]:
+    async def _execute_approved_tools(self, approved_tools: list[ToolCall]) -> list[ToolMessage]:
         """承認されたツールを並列実行
 
         Args:
@@ -408,33 +993,46 @@ class ResearchAgent:
         Returns:
             list[ToolMessage]: ツール実行結果リスト
         """
-        tool_futures = [
-            self._tool_executor.execute(tool_call)
-            for tool_call in approved_tools
-        ]
-
-        return [future.result() for future in tool_futures]
+        results = await asyncio.gather(
+            *(self._tool_executor.execute(tool_call) for tool_call in approved_tools)
+        )
+        return list(results)
 
 
 # エージェントの初期化とエントリーポイント設定
 _tool_registry = ToolRegistry(working_directory="report")
-_llm_invoker = AgentLLMInvoker(tools=_tool_registry.get_all_tools())
-_tool_executor = ToolExecutor(tool_registry=_tool_registry)
+_observation_store = ObservationStore("observations.db")
+_llm_invoker = AgentLLMInvoker(
+    tools=_tool_registry.get_all_tools(),
+    observation_store=_observation_store
+)
+_tool_executor = ToolExecutor(
+    tool_registry=_tool_registry,
+    observation_store=_observation_store
+)
 _request_factory = ToolApprovalRequestFactory(
     web_search_tool_name=_tool_registry.web_search_tool_name,
     file_write_tool_name=_tool_registry.file_write_tool_name
 )
 _approval_manager = ToolExecutionApprover(request_factory=_request_factory)
+_message_compressor = MessageWindowCompressor(max_tokens=4000, keep_recent=6)
 _research_agent = ResearchAgent(
     llm_invoker=_llm_invoker,
     tool_executor=_tool_executor,
-    approval_manager=_approval_manager
+    approval_manager=_approval_manager,
+    message_compressor=_message_compressor
 )
 
-checkpointer = MemorySaver()
+# SQLiteベースのチェックポインタで長時間スレッドでもメモリ使用量を抑える
+# 実行経路はすべて非同期(astream/ainvoke)のため、非同期メソッドを実装する
+# AsyncSqliteSaverを使う。接続は初回のチェックポイント操作時に確立される
+# durability="sync"(チェックポイント書き込みFutureのコルーチンチェーンに
+# よる履歴保持を避ける指定)はentrypointでは解釈されないため、
+# astream/ainvokeの呼び出し側で都度指定する
+checkpointer = AsyncSqliteSaver(aiosqlite.connect("checkpoints.db"))
 
 @entrypoint(checkpointer)
-def agent(messages: list[BaseMessage]) -> AIMessage:
+async def agent(messages: list[BaseMessage]) -> AIMessage:
     """エージェントのエントリーポイント
 
     Args:
@@ -443,4 +1041,34 @@ def agent(messages: list[BaseMessage]) -> AIMessage:
     Returns:
         AIMessage: エージェントの最終応答
     """
-    return _research_agent.run(messages)
+    return await _research_agent.run(messages)
+
+
+async def abatch(
+    batches: list[list[BaseMessage]],
+    max_concurrency: int = 8
+) -> list[AIMessage]:
+    """複数のリクエストを1つのコンパイル済みグラフで並列実行
+
+    データセット評価などで複数リクエストを処理する際に、
+    スレッドIDを分けてLLM呼び出しのI/O待ちをオーバーラップさせる。
+    同時実行数はBedrockのレート制限を考慮してセマフォで制限する。
+
+    Args:
+        batches: リクエストごとの初期メッセージリスト
+        max_concurrency: 同時実行数の上限
+
+    Returns:
+        list[AIMessage]: リクエストごとの最終応答(入力と同順)
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _run_single(messages: list[BaseMessage]) -> AIMessage:
+        async with semaphore:
+            config = {"configurable": {"thread_id": uuid.uuid4().hex}}
+            return await agent.ainvoke(messages, config=config, durability="sync")
+
+    results = await asyncio.gather(
+        *(_run_single(messages) for messages in batches)
+    )
+    return list(results)
@@ -1,24 +1,36 @@
+import asyncio
+import itertools
+import logging
+import queue
+import threading
 import uuid
-from dataclasses import dataclass
-from typing import Protocol
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Protocol, TypedDict
 import streamlit as st
 from langchain_core.messages import HumanMessage
 from langgraph.types import Command
 
-from agent_core import agent
+log = logging.getLogger(__name__)
 
+# 長時間セッションでのメモリ増加を抑えるための履歴保持上限
+MAX_MESSAGES = 500
 
-@dataclass
+
+@dataclass(slots=True)
 class SessionState:
     """セッション状態を管理する値オブジェクト
 
     目的: UI状態データをカプセル化し、安全な状態管理を実現
     """
-    messages: list[dict]
+    roles: deque[str]
+    contents: deque[str]
     waiting_for_approval: bool
     final_result: str | None
     thread_id: str | None
-    tool_info: dict | None = None
+    tool_info: list[dict] | None = None
+    rendered_count: int = 0
+    agent_config: dict | None = None
 
     @staticmethod
     def create_initial() -> 'SessionState':
@@ -28,11 +40,14 @@ class SessionState:
             SessionState: 初期化されたセッション状態
         """
         return SessionState(
-            messages=[],
+            roles=deque(maxlen=MAX_MESSAGES),
+            contents=deque(maxlen=MAX_MESSAGES),
             waiting_for_approval=False,
             final_result=None,
             thread_id=None,
-            tool_info=None
+            tool_info=None,
+            rendered_count=0,
+            agent_config=None
         )
 
     def reset(self) -> 'SessionState':
@@ -44,101 +59,112 @@ class SessionState:
         return SessionState.create_initial()
 
 
-class SessionStateManager:
-    """Streamlitセッション状態を管理する責務を持つクラス
+class SessionStateDict(TypedDict):
+    """st.session_stateが保持するUI状態のスキーマ
 
-    目的: st.session_stateへのアクセスをカプセル化し、
-         状態の初期化とリセットロジックを統一
+    目的: セッション状態のキーと型を1箇所で定義し、
+         直接アクセス時の型チェックを可能にする
     """
+    roles: deque[str]
+    contents: deque[str]
+    waiting_for_approval: bool
+    final_result: str | None
+    thread_id: str | None
+    tool_info: list[dict] | None
+    rendered_count: int
+    agent_config: dict | None
 
-    def __init__(self):
-        """セッション状態を初期化"""
-        self._ensure_initialized()
-
-    def _ensure_initialized(self) -> None:
-        """セッション状態が初期化されていることを保証"""
-        if 'messages' not in st.session_state:
-            initial_state = SessionState.create_initial()
-            st.session_state.messages = initial_state.messages
-            st.session_state.waiting_for_approval = initial_state.waiting_for_approval
-            st.session_state.final_result = initial_state.final_result
-            st.session_state.thread_id = initial_state.thread_id
-            st.session_state.tool_info = initial_state.tool_info
-
-    def reset(self) -> None:
-        """セッション状態をリセット"""
-        reset_state = SessionState.create_initial()
-        st.session_state.messages = reset_state.messages
-        st.session_state.waiting_for_approval = reset_state.waiting_for_approval
-        st.session_state.final_result = reset_state.final_result
-        st.session_state.thread_id = reset_state.thread_id
-        st.session_state.tool_info = reset_state.tool_info
-
-    def add_message(self, role: str, content: str) -> None:
-        """メッセージを追加
 
-        Args:
-            role: メッセージの役割(user/assistant/system)
-            content: メッセージ内容
-        """
-        st.session_state.messages.append({"role": role, "content": content})
+def ensure_session_initialized() -> None:
+    """セッション状態が初期化されていることを保証"""
+    if 'roles' not in st.session_state:
+        st.session_state.update(asdict(SessionState.create_initial()))
 
-    def set_waiting_approval(self, waiting: bool) -> None:
-        """承認待ち状態を設定
 
-        Args:
-            waiting: 承認待ちかどうか
-        """
-        st.session_state.waiting_for_approval = waiting
+def reset_session() -> None:
+    """セッション状態をリセット"""
+    st.session_state.update(asdict(SessionState.create_initial()))
 
-    def set_tool_info(self, tool_info: dict) -> None:
-        """ツール情報を設定
 
-        Args:
-            tool_info: ツール情報辞書
-        """
-        st.session_state.tool_info = tool_info
+def add_message(role: str, content: str) -> None:
+    """メッセージを追加
 
-    def set_final_result(self, result: str) -> None:
-        """最終結果を設定
+    ロールと内容を並行リスト(SoA)に追記する。メッセージごとの
+    辞書アロケーションを避け、描画時の走査もキャッシュ効率が良い。
+    保持数はMAX_MESSAGES件で頭打ちになり、古い分から破棄される。
 
-        Args:
-            result: 最終結果文字列
-        """
-        st.session_state.final_result = result
+    Args:
+        role: メッセージの役割(user/assistant/system)
+        content: メッセージ内容
+    """
+    adjust_cursor_for_eviction(1)
+    st.session_state['roles'].append(role)
+    st.session_state['contents'].append(content)
 
-    def set_thread_id(self, thread_id: str) -> None:
-        """スレッドIDを設定
 
-        Args:
-            thread_id: スレッドID
-        """
-        st.session_state.thread_id = thread_id
+def adjust_cursor_for_eviction(incoming: int) -> None:
+    """満杯のdequeへの追記で失われる件数だけ描画カーソルを戻す
+
+    dequeが上限に達すると追記のたびに先頭が破棄されて全インデックスが
+    繰り上がるため、カーソルを追随させないと新規メッセージが未描画の
+    まま読み飛ばされる。
+
+    Args:
+        incoming: これから追記するメッセージ数
+    """
+    roles = st.session_state['roles']
+    evicted = len(roles) + incoming - roles.maxlen
+    if evicted > 0:
+        set_rendered_count(max(st.session_state['rendered_count'] - evicted, 0))
+
 
-    @property
-    def messages(self) -> list[dict]:
-        """メッセージリストを取得"""
-        return st.session_state.messages
+def set_waiting_approval(waiting: bool) -> None:
+    """承認待ち状態を設定
 
-    @property
-    def waiting_for_approval(self) -> bool:
-        """承認待ち状態を取得"""
-        return st.session_state.waiting_for_approval
+    Args:
+        waiting: 承認待ちかどうか
+    """
+    st.session_state['waiting_for_approval'] = waiting
 
-    @property
-    def tool_info(self) -> dict | None:
-        """ツール情報を取得"""
-        return st.session_state.tool_info
 
-    @property
-    def final_result(self) -> str | None:
-        """最終結果を取得"""
-        return st.session_state.final_result
+def set_tool_info(tool_info: list[dict]) -> None:
+    """ツール情報を設定
+
+    Args:
+        tool_info: 承認待ちツール情報のリスト
+    """
+    st.session_state['tool_info'] = tool_info
+
+
+def set_final_result(result: str) -> None:
+    """最終結果を設定
+
+    Args:
+        result: 最終結果文字列
+    """
+    st.session_state['final_result'] = result
 
-    @property
-    def thread_id(self) -> str | None:
-        """スレッドIDを取得"""
-        return st.session_state.thread_id
+
+def set_thread_id(thread_id: str) -> None:
+    """スレッドIDと対応するエージェント実行設定を設定
+
+    設定辞書はスレッドID確定時に1度だけ構築し、
+    実行のたびに組み立て直さない。
+
+    Args:
+        thread_id: スレッドID
+    """
+    st.session_state['thread_id'] = thread_id
+    st.session_state['agent_config'] = {"configurable": {"thread_id": thread_id}}
+
+
+def set_rendered_count(count: int) -> None:
+    """描画済みメッセージ数を設定
+
+    Args:
+        count: 描画済みメッセージ数
+    """
+    st.session_state['rendered_count'] = count
 
 
 class AgentStreamProcessor:
@@ -147,63 +173,199 @@ class AgentStreamProcessor:
     目的: エージェント実行結果のストリーム処理をカプセル化
     """
 
-    def __init__(self, session_manager: SessionStateManager):
+    _END_OF_STREAM = object()
+
+    def __init__(self, agent, loop: asyncio.AbstractEventLoop):
         """
         Args:
-            session_manager: セッション状態管理
+            agent: コンパイル済みエージェントのハンドル
+            loop: エージェント実行専用のイベントループ
         """
-        self._session_manager = session_manager
+        self._agent = agent
+        self._loop = loop
+        self._pending_roles: list[str] = []
+        self._pending_contents: list[str] = []
+        # タスク名→ハンドラ の事前ディスパッチ表(チャンクごとの文字列比較を回避)
+        self._handlers = {
+            "__interrupt__": self._handle_interrupt,
+            "agent": self._handle_agent_result,
+            "_invoke_llm_task": self._extract_llm_texts,
+            "_execute_tool_task": lambda _result: self._handle_tool_execution(),
+        }
 
     def run(self, input_data: list[HumanMessage] | Command) -> None:
         """エージェントを実行し、結果をストリーミング処理
 
+        LLM推論テキストはst.write_streamで逐次表示し、完了後に
+        1つのアシスタントメッセージとしてまとめて履歴に追加する。
+        承認フィードバック(Command)の再開はストリーム収集を介さず
+        直接invokeで処理する。
+
         Args:
             input_data: エージェントへの入力データ
         """
-        config = {"configurable": {"thread_id": self._session_manager.thread_id}}
+        config = st.session_state['agent_config']
+
+        if isinstance(input_data, Command):
+            with st.spinner("処理中...", show_time=True):
+                self._resume_with_invoke(input_data, config)
+            return
 
         with st.spinner("処理中...", show_time=True):
-            for chunk in agent.stream(input_data, stream_mode="updates", config=config):
-                self._process_chunk(chunk)
-            st.rerun()
+            self._pending_roles = []
+            self._pending_contents = []
+            streamed_text = st.write_stream(self._stream_text(input_data, config))
+            self._flush_pending_messages()
+            if streamed_text:
+                add_message("assistant", streamed_text)
+                self._skip_rendering_streamed_message()
+
+    def _resume_with_invoke(self, command: Command, config: dict) -> None:
+        """承認フィードバックによる再開をストリーム処理を介さず実行
+
+        再開入力はメモリ内のCommandのみで、チャンク単位の逐次表示は
+        不要なため、収集・ディスパッチの層を飛ばして直接invokeする。
+
+        Args:
+            command: 承認結果を含む再開コマンド
+            config: エージェント実行設定
+        """
+        future = asyncio.run_coroutine_threadsafe(
+            self._agent.ainvoke(command, config=config, durability="sync"),
+            self._loop,
+        )
+        result = future.result()
+
+        if isinstance(result, dict) and "__interrupt__" in result:
+            self._handle_interrupt(result["__interrupt__"])
+        else:
+            self._handle_agent_result(result)
+
+    def _flush_pending_messages(self) -> None:
+        """バッファしたメッセージを1回のextendでセッション状態へ反映
+
+        チャンクごとのセッション状態書き込みを避け、
+        ストリーム完了時にまとめて追記する。
+        """
+        if self._pending_roles:
+            adjust_cursor_for_eviction(len(self._pending_roles))
+            st.session_state['roles'].extend(self._pending_roles)
+            st.session_state['contents'].extend(self._pending_contents)
+            self._pending_roles = []
+            self._pending_contents = []
+
+    @staticmethod
+    def _skip_rendering_streamed_message() -> None:
+        """write_stream表示済みメッセージの二重描画を防ぐ
 
-    def _process_chunk(self, chunk: dict) -> None:
+        直前に追加したメッセージ以外に未描画分がない場合のみ、
+        描画済みカーソルを進める。
+        """
+        roles = st.session_state['roles']
+        if st.session_state['rendered_count'] == len(roles) - 1:
+            set_rendered_count(len(roles))
+
+    def _stream_text(self, input_data: list[HumanMessage] | Command, config: dict):
+        """チャンクを処理しながらLLM推論テキストを逐次yieldする
+
+        Args:
+            input_data: エージェントへの入力データ
+            config: エージェント実行設定
+
+        Yields:
+            str: LLM推論結果のテキスト断片
+        """
+        for chunk in self._stream_chunks(input_data, config):
+            yield from self._process_chunk(chunk)
+
+    def _stream_chunks(self, input_data: list[HumanMessage] | Command, config: dict):
+        """非同期ストリームをチャンク単位で同期ジェネレータへ橋渡し
+
+        専用イベントループ上でastreamを駆動し、到着したチャンクを
+        スレッドセーフなキュー経由でその場で引き渡す。全チャンクの
+        収集完了を待たないため、最初のタスク結果から逐次表示される。
+
+        Args:
+            input_data: エージェントへの入力データ
+            config: エージェント実行設定
+
+        Yields:
+            dict: ストリーミングされたチャンク
+        """
+        chunk_queue: queue.Queue = queue.Queue()
+
+        async def _produce() -> None:
+            try:
+                async for chunk in self._agent.astream(
+                    input_data, stream_mode="updates", config=config,
+                    durability="sync"
+                ):
+                    chunk_queue.put(chunk)
+            finally:
+                chunk_queue.put(self._END_OF_STREAM)
+
+        future = asyncio.run_coroutine_threadsafe(_produce(), self._loop)
+        while (chunk := chunk_queue.get()) is not self._END_OF_STREAM:
+            yield chunk
+        # プロデューサ側で発生した例外を呼び出しスレッドで再送出する
+        future.result()
+
+    def _process_chunk(self, chunk: dict):
         """チャンクを処理
 
         Args:
             chunk: ストリーミングされたチャンクデータ
+
+        Yields:
+            str: LLM推論結果のテキスト断片
         """
         for task_name, result in chunk.items():
-            print("task_name:", task_name, "result:", result)
+            # reprの構築自体が重いため、DEBUG無効時は整形ごとスキップする
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("task_name=%s result=%r", task_name, result)
+
+            handler = self._handlers.get(task_name)
+            if handler is None:
+                continue
 
-            if task_name == "__interrupt__":
-                self._handle_interrupt(result)
-            elif task_name == "agent":
-                self._handle_agent_result(result)
-            elif task_name == "invoke_llm":
-                self._handle_llm_result(result)
-            elif task_name == "use_tool":
-                self._handle_tool_execution()
+            texts = handler(result)
+            if texts is not None:
+                yield from texts
 
     def _handle_interrupt(self, result: list) -> None:
         """割り込み(承認待ち)を処理"""
-        self._session_manager.set_tool_info(result[0].value)
-        self._session_manager.set_waiting_approval(True)
+        set_tool_info(result[0].value)
+        set_waiting_approval(True)
 
     def _handle_agent_result(self, result) -> None:
         """エージェント最終結果を処理"""
-        self._session_manager.set_final_result(result.content)
+        set_final_result(result.content)
 
-    def _handle_llm_result(self, result) -> None:
-        """LLM推論結果を処理"""
-        if isinstance(result.content, list):
-            for content in result.content:
-                if content["type"] == "text":
-                    self._session_manager.add_message("assistant", content["text"])
+    def _extract_llm_texts(self, result) -> list[str] | None:
+        """LLM推論結果からテキスト断片を抽出
+
+        想定外の形はガード節で早期リターンし、本流は
+        ネストのない1つのリスト内包表記で組み立てる。
+
+        Args:
+            result: LLM推論タスクの結果
+
+        Returns:
+            list[str] | None: テキスト断片のリスト。抽出対象がない場合はNone
+        """
+        if not isinstance(result.content, list):
+            return None
+
+        return [
+            content["text"]
+            for content in result.content
+            if content["type"] == "text"
+        ]
 
     def _handle_tool_execution(self) -> None:
         """ツール実行を処理"""
-        self._session_manager.add_message("system", "ツール実行")
+        self._pending_roles.append("system")
+        self._pending_contents.append("ツール実行")
 
 
 class UserFeedbackCollector:
@@ -215,23 +377,46 @@ class UserFeedbackCollector:
     APPROVE_FEEDBACK = "APPROVE"
     DENY_FEEDBACK = "DENY"
 
-    def collect(self) -> str | None:
-        """承認/拒否フィードバックを収集
+    _APPROVE_LABEL = "承認"
+    _DENY_LABEL = "拒否"
+
+    def render_decision_widget(self, index: int) -> str:
+        """1件の承認リクエストに対する承認/拒否の選択肢を表示
+
+        Args:
+            index: 承認リクエストのインデックス
 
         Returns:
-            str | None: "APPROVE"/"DENY" または None(未選択)
+            str: 現在選択されているラベル
         """
-        approve_column, deny_column = st.columns(2)
+        return st.radio(
+            "実行の可否",
+            [self._APPROVE_LABEL, self._DENY_LABEL],
+            key=f"approval_decision_{index}",
+            horizontal=True,
+        )
 
-        with approve_column:
-            if st.button("承認"):
-                return self.APPROVE_FEEDBACK
+    def collect(self, decisions: list[str]) -> list[str] | None:
+        """リクエストごとの承認/拒否フィードバックを収集
 
-        with deny_column:
-            if st.button("拒否"):
-                return self.DENY_FEEDBACK
+        個別の選択を1つのフォームにまとめることで、M件の判断を
+        1回の送信(1回の再実行)で収集する。
+
+        Args:
+            decisions: リクエストごとの選択ラベル
 
-        return None
+        Returns:
+            list[str] | None: リクエストごとの"APPROVE"/"DENY"。未送信時はNone
+        """
+        submitted = st.form_submit_button("送信")
+        if not submitted:
+            return None
+        return [
+            self.APPROVE_FEEDBACK
+            if decision == self._APPROVE_LABEL
+            else self.DENY_FEEDBACK
+            for decision in decisions
+        ]
 
 
 class MessageDisplayRenderer:
@@ -240,28 +425,44 @@ class MessageDisplayRenderer:
     目的: チャットメッセージのレンダリングロジックをカプセル化
     """
 
-    def render(self, messages: list[dict]) -> None:
+    def render(self, roles: deque[str], contents: deque[str], start: int = 0) -> int:
         """メッセージリストを表示
 
+        ロールと内容の並行リスト(SoA)を先頭から走査し、同一ロールの
+        連続メッセージは1つのチャットメッセージにまとめて描画する。
+
         Args:
-            messages: 表示するメッセージリスト
+            roles: 表示するメッセージのロールリスト
+            contents: 表示するメッセージの内容リスト
+            start: 描画を開始するインデックス(描画済み分をスキップ)
+
+        Returns:
+            int: 描画後の描画済みメッセージ数
         """
-        for message in messages:
-            self._render_single_message(message)
+        # dequeはスライスできないため、isliceでコピーなしに読み飛ばす
+        pairs = zip(
+            itertools.islice(roles, start, None),
+            itertools.islice(contents, start, None),
+        )
+        for role, group in itertools.groupby(
+            pairs, key=lambda pair: self._normalize_role(pair[0])
+        ):
+            merged = "\n\n".join(content for _, content in group)
+            st.chat_message(role).markdown(merged)
 
-    def _render_single_message(self, message: dict) -> None:
-        """単一メッセージを表示
+        return len(roles)
+
+    @staticmethod
+    def _normalize_role(role: str) -> str:
+        """メッセージのロールを表示用ロールに正規化
 
         Args:
-            message: 表示するメッセージ
-        """
-        role = message["role"]
-        content = message["content"]
+            role: 対象メッセージのロール
 
-        if role == "user":
-            st.chat_message("user").write(content)
-        else:
-            st.chat_message("assistant").write(content)
+        Returns:
+            str: "user" または "assistant"
+        """
+        return "user" if role == "user" else "assistant"
 
 
 class ToolApprovalRenderer:
@@ -277,22 +478,33 @@ class ToolApprovalRenderer:
         """
         self._feedback_collector = feedback_collector
 
-    def render_and_collect_feedback(self, tool_info: dict) -> str | None:
+    def render_and_collect_feedback(self, tool_info: list[dict]) -> list[str] | None:
         """ツール承認UIを表示しフィードバックを収集
 
+        リクエストごとに承認/拒否を選択でき、判断は1回の送信で
+        まとめて収集する(Web検索のみ承認してファイル保存を拒否する
+        といった個別判断が可能)。
+
         Args:
-            tool_info: ツール情報
+            tool_info: 承認待ちツール情報のリスト
 
         Returns:
-            str | None: ユーザーのフィードバック結果
+            list[str] | None: リクエストごとのフィードバック結果
         """
-        st.info(tool_info["args"])
+        with st.form("approval", clear_on_submit=True):
+            decisions = []
+            for index, tool_request in enumerate(tool_info):
+                st.info(tool_request["args"])
 
-        if tool_info["name"] == "write_file" and "html" in tool_info:
-            with st.container():
-                st.html(tool_info["html"])
+                if tool_request["name"] == "write_file" and "html" in tool_request:
+                    with st.container():
+                        st.html(tool_request["html"])
 
-        return self._feedback_collector.collect()
+                decisions.append(
+                    self._feedback_collector.render_decision_widget(index)
+                )
+
+            return self._feedback_collector.collect(decisions)
 
 
 class ResearchAgentUI:
@@ -303,19 +515,16 @@ class ResearchAgentUI:
 
     def __init__(
         self,
-        session_manager: SessionStateManager,
         stream_processor: AgentStreamProcessor,
         message_renderer: MessageDisplayRenderer,
         approval_renderer: ToolApprovalRenderer
     ):
         """
         Args:
-            session_manager: セッション状態管理
             stream_processor: エージェントストリーミング処理
             message_renderer: メッセージ表示
             approval_renderer: ツール承認UI表示
         """
-        self._session_manager = session_manager
         self._stream_processor = stream_processor
         self._message_renderer = message_renderer
         self._approval_renderer = approval_renderer
@@ -324,60 +533,164 @@ class ResearchAgentUI:
         """UIアプリケーションを実行"""
         st.title("AIエージェントデモアプリ")
 
-        self._message_renderer.render(self._session_manager.messages)
+        self._chat_area()
+        self._approval_area()
 
-        if self._session_manager.waiting_for_approval and self._session_manager.tool_info:
-            self._handle_tool_approval()
-        elif self._session_manager.final_result and not self._session_manager.waiting_for_approval:
+    @st.fragment
+    def _chat_area(self) -> None:
+        """チャット履歴・最終結果・入力欄を描画するフラグメント
+
+        状態変化時にページ全体ではなくこの領域だけを再実行する。
+        """
+        # プロキシ経由の参照を減らすため、状態は先頭でローカル変数へ読み出す
+        ss: SessionStateDict = st.session_state
+        waiting_for_approval = ss['waiting_for_approval']
+        final_result = ss['final_result']
+
+        # フラグメント実行時は出力が描き直されるため、カーソルを先頭に戻す
+        set_rendered_count(0)
+        rendered_count = self._message_renderer.render(ss['roles'], ss['contents'])
+        set_rendered_count(rendered_count)
+
+        if final_result and not waiting_for_approval:
             self._display_final_result()
 
-        if not self._session_manager.waiting_for_approval:
+        if not waiting_for_approval:
             self._handle_user_input()
         else:
-            st.info("ツールの使用承認を待っています。上記のボタンを押してください。")
+            st.info("ツールの使用承認を待っています。下記のボタンを押してください。")
+
+    @st.fragment
+    def _approval_area(self) -> None:
+        """ツール承認UIを描画するフラグメント
+
+        承認待ちでない場合は何も描画しない。
+        """
+        ss: SessionStateDict = st.session_state
+        if ss['waiting_for_approval'] and ss['tool_info']:
+            self._handle_tool_approval()
 
     def _handle_tool_approval(self) -> None:
         """ツール承認処理"""
-        feedback_result = self._approval_renderer.render_and_collect_feedback(
-            self._session_manager.tool_info
-        )
+        tool_info = st.session_state['tool_info']
+        feedback_results = self._approval_renderer.render_and_collect_feedback(tool_info)
 
-        if feedback_result:
-            st.chat_message("user").write(feedback_result)
-            self._session_manager.add_message("user", feedback_result)
-            self._session_manager.set_waiting_approval(False)
-            self._stream_processor.run(Command(resume=feedback_result))
+        if feedback_results:
+            feedback_text = " / ".join(feedback_results)
+            st.chat_message("user").write(feedback_text)
+            add_message("user", feedback_text)
+            set_waiting_approval(False)
+            self._stream_processor.run(Command(resume=feedback_results))
+            self._rerun_after_feedback()
+
+    @staticmethod
+    def _rerun_after_feedback() -> None:
+        """フィードバック処理後の再実行範囲を決定する
+
+        続けて承認が必要な場合は承認フラグメントのみ、
+        チャット領域の表示が変わる場合は全体を再実行する。
+        """
+        if st.session_state['waiting_for_approval']:
+            st.rerun(scope="fragment")
+        else:
+            st.rerun()
 
     def _display_final_result(self) -> None:
         """最終結果を表示"""
         st.subheader("最終結果")
-        st.success(self._session_manager.final_result)
+        st.success(st.session_state['final_result'])
 
     def _handle_user_input(self) -> None:
         """ユーザー入力を処理"""
         user_input = st.chat_input("入力してください。")
 
         if user_input:
-            self._session_manager.reset()
-            self._session_manager.set_thread_id(str(uuid.uuid4()))
+            reset_session()
+            set_thread_id(uuid.uuid4().hex)
 
             st.chat_message("user").write(user_input)
-            self._session_manager.add_message("user", user_input)
+            add_message("user", user_input)
+            # インライン描画済みのユーザーメッセージはカーソルを進めてスキップ
+            set_rendered_count(st.session_state['rendered_count'] + 1)
 
             messages = [HumanMessage(content=user_input)]
             self._stream_processor.run(messages)
+            self._render_new_messages()
+            self._rerun_if_layout_changed()
+
+    def _render_new_messages(self) -> None:
+        """未描画のメッセージのみを追い描画する
+
+        実行中に追加されたメッセージをO(新規分)で描画し、
+        履歴全体のO(N)再描画を避ける。
+        """
+        rendered_count = self._message_renderer.render(
+            st.session_state['roles'],
+            st.session_state['contents'],
+            start=st.session_state['rendered_count']
+        )
+        set_rendered_count(rendered_count)
+
+    @staticmethod
+    def _rerun_if_layout_changed() -> None:
+        """画面構成が変わる状態遷移があった場合のみ再実行する
+
+        承認待ちUIは別フラグメントにあるため全体を、
+        最終結果はチャット領域内のためフラグメントのみを再実行する。
+        """
+        if st.session_state['waiting_for_approval']:
+            st.rerun()
+        elif st.session_state['final_result']:
+            st.rerun(scope="fragment")
+
+
+@st.cache_resource
+def get_agent():
+    """コンパイル済みエージェントをプロセス内で1度だけ取得
+
+    Returns:
+        コンパイル済みエージェントのハンドル
+    """
+    from agent_core import agent as compiled_agent
+    return compiled_agent
+
+
+@st.cache_resource
+def get_agent_loop() -> asyncio.AbstractEventLoop:
+    """エージェント実行専用のイベントループをプロセス内で1度だけ起動
+
+    実行のたびにasyncio.runで使い捨てループを作ると、非同期
+    チェックポインタ内部のロックがループを跨げず2回目以降の実行が
+    失敗するため、常駐のバックグラウンドループ1本に全実行を集約する。
+
+    Returns:
+        asyncio.AbstractEventLoop: バックグラウンドスレッドで動くループ
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(
+        target=loop.run_forever, name="agent-loop", daemon=True
+    ).start()
+    return loop
+
+
+@st.cache_resource
+def get_renderers() -> tuple[MessageDisplayRenderer, ToolApprovalRenderer]:
+    """不変なUIコンポーネントをプロセス内で1度だけ構築
+
+    Returns:
+        tuple: (メッセージ表示, ツール承認UI表示)
+    """
+    feedback_collector = UserFeedbackCollector()
+    return MessageDisplayRenderer(), ToolApprovalRenderer(feedback_collector)
 
 
 def main():
     """メイン関数: アプリケーションの初期化と実行"""
-    session_manager = SessionStateManager()
-    stream_processor = AgentStreamProcessor(session_manager)
-    message_renderer = MessageDisplayRenderer()
-    feedback_collector = UserFeedbackCollector()
-    approval_renderer = ToolApprovalRenderer(feedback_collector)
+    ensure_session_initialized()
+    stream_processor = AgentStreamProcessor(get_agent(), get_agent_loop())
+    message_renderer, approval_renderer = get_renderers()
 
     ui = ResearchAgentUI(
-        session_manager=session_manager,
         stream_processor=stream_processor,
         message_renderer=message_renderer,
         approval_renderer=approval_renderer